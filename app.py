@@ -11,6 +11,15 @@ import xml.etree.ElementTree as ET
 import sqlite3
 import pycountry
 import datetime
+from band_monitor import MonitorAberturas, notificar_log, criar_notificador_webhook
+from config import (
+    ALERTA_WEBHOOK_URL, ALERTA_INTERVALO_SEGUNDOS, INDICATIVOS_DB_PATH,
+    EXPORT_HOST, EXPORT_PORTA
+)
+from export import (
+    FORMATOS, criar_carregador, filtrar_spots, iniciar_servidor, url_exportacao,
+    url_publica
+)
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -59,7 +68,7 @@ mode_mapping = {
 df['mode'] = df['code'].map(mode_mapping)
 
 # Configurar o banco de dados SQLite
-DB_PATH = 'd:/Documents/projetos/wspr/indicativos.db'
+DB_PATH = INDICATIVOS_DB_PATH  # Mesmo banco usado pelo endpoint de exportação
 
 # Função para inicializar o banco de dados
 def init_db():
@@ -250,6 +259,40 @@ with col1:
 with col2:
     st.metric(label="Horário de Mato Grosso do Sul", value=ms_time)
 
+# Monitor de aberturas: um único monitor compartilhado por todas as sessões,
+# alimentado em segundo plano com os spots novos do arquivo
+@st.cache_resource
+def obter_monitor_aberturas():
+    monitor = MonitorAberturas()
+    monitor.adicionar_notificador(notificar_log)
+    webhook_url = os.getenv('ALERTA_WEBHOOK_URL', ALERTA_WEBHOOK_URL)
+    if webhook_url:
+        monitor.adicionar_notificador(criar_notificador_webhook(webhook_url))
+
+    carregar = criar_carregador('spots.json', DB_PATH)
+
+    def obter_spots(desde):
+        spots = carregar().sort_values('time')
+        if desde is not None:
+            spots = spots[spots['time'] >= desde]
+        return [
+            (row.time.to_pydatetime(), row.band, row.continent, row.id)
+            for row in spots[['time', 'band', 'continent', 'id']].itertuples(index=False)
+        ]
+
+    monitor.iniciar_poller(obter_spots, ALERTA_INTERVALO_SEGUNDOS)
+    return monitor
+
+monitor = obter_monitor_aberturas()
+
+# O banner apenas lê o estado do monitor, atualizado pelo poller
+@st.fragment(run_every=ALERTA_INTERVALO_SEGUNDOS)
+def exibir_alertas_aberturas():
+    for alerta in monitor.alertas_ativos():
+        st.warning(alerta.mensagem(), icon="📡")
+
+exibir_alertas_aberturas()
+
 # Sidebar para filtros
 st.sidebar.header("Filtros")
 
@@ -266,11 +309,7 @@ hour_start = st.sidebar.slider("Hora Inicial", 0, 23, 0)
 hour_end = st.sidebar.slider("Hora Final", 0, 23, 23)
 
 # Aplicar filtros ao DataFrame
-if selected_band:
-    filtered_df = filtered_df[filtered_df['band'].isin(selected_band)]
-if start_date and end_date:
-    filtered_df = filtered_df[(filtered_df['time'].dt.date >= start_date) & (filtered_df['time'].dt.date <= end_date)]
-filtered_df = filtered_df[(filtered_df['hour'] >= hour_start) & (filtered_df['hour'] <= hour_end)]
+filtered_df = filtrar_spots(df, selected_band, start_date, end_date, hour_start, hour_end)
 
 # Agrupar por hora cheia e banda
 filtered_df_grouped = filtered_df.groupby(['hora_cheia', 'band']).agg(
@@ -401,3 +440,39 @@ st.caption("Este gráfico mostra como a qualidade do sinal (SNR) varia ao longo
 st.subheader("Tabela de Dados Detalhados")
 st.dataframe(filtered_df[['time', 'rx_sign', 'tx_sign', 'band', 'snr', 'distance', 'mode', 'power_w', 'azimuth_rx_to_tx', 'country', 'continent']])
 st.caption("Esta tabela exibe informações detalhadas de cada sinal recebido, incluindo horário, banda, nível de sinal (SNR), e direção de propagação (azimute).")
+
+# Exportação dos dados filtrados: o endpoint é iniciado uma única vez junto com o app
+@st.cache_resource
+def iniciar_endpoint_exportacao():
+    host = os.getenv('EXPORT_HOST', EXPORT_HOST)
+    porta = int(os.getenv('EXPORT_PORTA', EXPORT_PORTA))
+    try:
+        return iniciar_servidor(host, porta, 'spots.json', DB_PATH)
+    except OSError as e:
+        # Porta ocupada, por exemplo por um "python export.py servir" já ativo
+        st.warning(f"Endpoint de exportação não iniciado em {host}:{porta}: {str(e)}")
+        return None
+
+iniciar_endpoint_exportacao()
+url_base_exportacao = url_publica(int(os.getenv('EXPORT_PORTA', EXPORT_PORTA)))
+
+st.subheader("Exportar Dados")
+tabela_exportacao = st.selectbox(
+    "Tabela",
+    options=['spots', 'hora_banda', 'hora_continente'],
+    format_func=lambda t: {
+        'spots': "Dados Detalhados",
+        'hora_banda': "Spots por Hora Cheia e Banda",
+        'hora_continente': "Spots por Hora Cheia e Continente",
+    }[t]
+)
+formatos_exportacao = [f for f in FORMATOS if tabela_exportacao == 'spots' or f != 'adif']
+for col, formato in zip(st.columns(len(formatos_exportacao)), formatos_exportacao):
+    with col:
+        st.link_button(
+            f"Baixar {formato.upper()}",
+            url_exportacao(formato, tabela_exportacao, selected_band, start_date, end_date, hour_start, hour_end,
+                           base_url=url_base_exportacao),
+            use_container_width=True
+        )
+st.caption("Os arquivos são gerados em blocos pelo endpoint de exportação, aplicando os mesmos filtros da barra lateral, sem montar o arquivo inteiro em memória.")
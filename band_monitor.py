@@ -0,0 +1,468 @@
+"""Monitor em tempo real de aberturas de banda por continente."""
+
+import datetime
+import logging
+import math
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import requests
+
+from config import (
+    ALERTA_BANDAS, ALERTA_JANELAS_MINUTOS, ALERTA_BUCKET_SEGUNDOS,
+    ALERTA_MIN_SPOTS, ALERTA_FATOR_BASELINE, ALERTA_DIAS_BASELINE,
+    ALERTA_MIN_DIAS_HISTORICO, ALERTA_BASELINE_MINIMA, ALERTA_P_VALOR,
+    ALERTA_COOLDOWN_MINUTOS, ALERTA_MAX_IDS
+)
+
+logger = logging.getLogger(__name__)
+
+EPOCA = datetime.datetime(1970, 1, 1)
+
+
+def probabilidade_poisson(n: int, esperado: float) -> float:
+    """Probabilidade P(X >= n) para X ~ Poisson(`esperado`)."""
+    if n <= 0:
+        return 1.0
+    termo = math.exp(-esperado)
+    acumulado = termo
+    for k in range(1, n):
+        termo *= esperado / k
+        acumulado += termo
+    return max(0.0, 1.0 - acumulado)
+
+
+@dataclass
+class Alerta:
+    """Abertura detectada para um par banda × continente."""
+    time: datetime.datetime
+    band: str
+    continent: str
+    janela_minutos: int
+    num_spots: int
+    baseline: float
+
+    def mensagem(self) -> str:
+        return (f"Abertura em {self.band} para {self.continent}: "
+                f"{self.num_spots} spots nos últimos {self.janela_minutos} min "
+                f"(baseline {self.baseline:.1f}) às {self.time:%H:%M} UTC")
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "time": self.time.isoformat(),
+            "band": self.band,
+            "continent": self.continent,
+            "janela_minutos": self.janela_minutos,
+            "num_spots": self.num_spots,
+            "baseline": self.baseline,
+        }
+
+
+class ContadorJanela:
+    """
+    Contador de janela deslizante baseado em ring buffer de buckets.
+
+    Cada bucket cobre `bucket_segundos`; buckets que saem da janela são
+    zerados ao avançar o relógio, mantendo o total atualizado em O(1)
+    amortizado por spot.
+    """
+
+    def __init__(self, janela_segundos: int, bucket_segundos: int):
+        self.bucket_segundos = bucket_segundos
+        self.num_buckets = max(1, janela_segundos // bucket_segundos)
+        self.buckets = [0] * self.num_buckets
+        self.total = 0
+        self.bucket_atual: Optional[int] = None
+
+    def _avancar(self, bucket: int) -> None:
+        if self.bucket_atual is None:
+            self.bucket_atual = bucket
+            return
+        if bucket <= self.bucket_atual:
+            return
+        passos = bucket - self.bucket_atual
+        if passos >= self.num_buckets:
+            self.buckets = [0] * self.num_buckets
+            self.total = 0
+        else:
+            for b in range(self.bucket_atual + 1, bucket + 1):
+                idx = b % self.num_buckets
+                self.total -= self.buckets[idx]
+                self.buckets[idx] = 0
+        self.bucket_atual = bucket
+
+    def adicionar(self, segundos: float, quantidade: int = 1) -> None:
+        """Registra spots no instante `segundos` (desde a época)."""
+        bucket = int(segundos // self.bucket_segundos)
+        self._avancar(bucket)
+        # Spots atrasados além da janela são descartados
+        if bucket <= self.bucket_atual - self.num_buckets:
+            return
+        self.buckets[bucket % self.num_buckets] += quantidade
+        self.total += quantidade
+
+    def contar(self, segundos: float) -> int:
+        """Retorna o total da janela terminando em `segundos`."""
+        self._avancar(int(segundos // self.bucket_segundos))
+        return self.total
+
+
+class MonitorAberturas:
+    """
+    Consome spots à medida que chegam e detecta aberturas de banda.
+
+    Para cada par banda × continente mantém contadores deslizantes (ex.: 15 e
+    60 min) e o histórico diário de spots por hora UTC. Cada abertura é
+    alertada uma vez, até o par voltar a ficar abaixo de `min_spots` na
+    maior janela. Um alerta só é
+    avaliado depois de `min_dias_historico` dias observados e é disparado
+    quando a contagem da janela atinge `min_spots` e:
+
+    - é improvável frente à média histórica da mesma hora, escalada para o
+      tamanho da janela (ver `acima_da_baseline`); ou
+    - a baseline é zero e o continente não aparece na banda em nenhum
+      horário dos últimos `dias_baseline` dias (abertura para um novo
+      continente).
+    """
+
+    def __init__(self,
+                 bandas: Optional[Iterable[str]] = ALERTA_BANDAS,
+                 janelas_minutos: Iterable[int] = ALERTA_JANELAS_MINUTOS,
+                 bucket_segundos: int = ALERTA_BUCKET_SEGUNDOS,
+                 min_spots: int = ALERTA_MIN_SPOTS,
+                 fator_baseline: float = ALERTA_FATOR_BASELINE,
+                 dias_baseline: int = ALERTA_DIAS_BASELINE,
+                 min_dias_historico: int = ALERTA_MIN_DIAS_HISTORICO,
+                 baseline_minima: float = ALERTA_BASELINE_MINIMA,
+                 p_valor: float = ALERTA_P_VALOR,
+                 cooldown_minutos: int = ALERTA_COOLDOWN_MINUTOS,
+                 max_ids: int = ALERTA_MAX_IDS):
+        self.bandas = set(bandas) if bandas is not None else None
+        self.janelas_minutos = tuple(janelas_minutos)
+        self.bucket_segundos = bucket_segundos
+        self.min_spots = min_spots
+        self.fator_baseline = fator_baseline
+        self.dias_baseline = dias_baseline
+        self.min_dias_historico = min_dias_historico
+        self.baseline_minima = baseline_minima
+        self.p_valor = p_valor
+        self.cooldown = datetime.timedelta(minutes=cooldown_minutos)
+
+        self.contadores: Dict[Tuple[str, str], Dict[int, ContadorJanela]] = {}
+        # (banda, continente, hora) -> {data: contagem} dos últimos dias
+        self.historico: Dict[Tuple[str, str, int], Dict[datetime.date, int]] = {}
+        # (banda, continente) -> datas com ao menos um spot do par
+        self.dias_par: Dict[Tuple[str, str], Set[datetime.date]] = {}
+        self.dias_observados: Set[datetime.date] = set()
+        self.ultimo_alerta: Dict[Tuple[str, str], datetime.datetime] = {}
+        # Pares com abertura já alertada e ainda em andamento
+        self.abertos: Set[Tuple[str, str]] = set()
+        self.alertas: deque = deque(maxlen=100)
+        self.notificadores: List[Callable[[Alerta], None]] = []
+        self.ultimo_spot: Optional[datetime.datetime] = None
+        # Ids recentes, para ignorar spots repetidos em releituras do arquivo
+        self.ids_recentes: deque = deque(maxlen=max_ids)
+        self.ids_vistos: Set = set()
+        self._parar = threading.Event()
+        # O monitor é compartilhado entre sessões do dashboard
+        self.lock = threading.RLock()
+
+    def adicionar_notificador(self, notificador: Callable[[Alerta], None]) -> None:
+        """Registra uma função chamada a cada alerta disparado."""
+        self.notificadores.append(notificador)
+
+    def _inicio_historico(self, data: datetime.date) -> datetime.date:
+        return data - datetime.timedelta(days=self.dias_baseline)
+
+    def dias_historico(self, data: datetime.date) -> int:
+        """Quantidade de dias observados na janela de histórico antes de `data`."""
+        inicio = self._inicio_historico(data)
+        return sum(1 for dia in self.dias_observados if inicio <= dia < data)
+
+    def _media_hora(self, band: str, continent: str, hora: int,
+                    data: datetime.date, num_dias: int) -> float:
+        dias = self.historico.get((band, continent, hora % 24))
+        if not dias:
+            return 0.0
+        inicio = self._inicio_historico(data)
+        return sum(contagem for dia, contagem in dias.items() if inicio <= dia < data) / num_dias
+
+    def baseline(self, band: str, continent: str, hora: int,
+                 data: datetime.date, janela_minutos: int) -> float:
+        """
+        Média de spots esperada na janela, com base em dias anteriores.
+
+        Usa a maior média entre a hora do spot e as horas vizinhas, já que
+        a janela pode atravessar a virada da hora.
+        """
+        # Dias sem spots no par também contam na média, desde que observados
+        num_dias = self.dias_historico(data)
+        if num_dias == 0:
+            return 0.0
+        media_hora = max(self._media_hora(band, continent, hora + k, data, num_dias)
+                         for k in (-1, 0, 1))
+        return media_hora * janela_minutos / 60
+
+    def acima_da_baseline(self, num_spots: int, base: float) -> bool:
+        """
+        Indica se a contagem é improvável como variação normal da baseline.
+
+        A baseline é limitada por baixo a `baseline_minima` e a contagem deve
+        superar `fator_baseline` vezes esse valor e ter probabilidade de
+        Poisson P(X >= num_spots) de no máximo `p_valor`.
+        """
+        esperado = max(base, self.baseline_minima)
+        if num_spots < self.fator_baseline * esperado:
+            return False
+        return probabilidade_poisson(num_spots, esperado) <= self.p_valor
+
+    def continente_novo(self, band: str, continent: str, data: datetime.date) -> bool:
+        """Indica se o continente não apareceu na banda nos dias anteriores."""
+        inicio = self._inicio_historico(data)
+        dias = self.dias_par.get((band, continent), ())
+        return not any(inicio <= dia < data for dia in dias)
+
+    def _podar(self, dias: Dict, data_limite: datetime.date) -> None:
+        for dia in [dia for dia in dias if dia < data_limite]:
+            del dias[dia]
+
+    def _registrar_dia(self, data: datetime.date) -> bool:
+        """Marca o dia como observado; retorna False se já saiu do histórico."""
+        ultimo_dia = max(self.dias_observados) if self.dias_observados else data
+        limite = self._inicio_historico(max(data, ultimo_dia))
+        # Spots atrasados além do histórico são descartados
+        if data < limite:
+            return False
+        if data not in self.dias_observados:
+            self.dias_observados.add(data)
+            if data > ultimo_dia:
+                # Novo dia: descarta o que saiu da janela de histórico
+                self.dias_observados = {d for d in self.dias_observados if d >= limite}
+                for historico in self.historico.values():
+                    self._podar(historico, limite)
+                for chave in self.dias_par:
+                    self.dias_par[chave] = {d for d in self.dias_par[chave] if d >= limite}
+        return True
+
+    def _registrar_historico(self, band: str, continent: str,
+                             time: datetime.datetime) -> None:
+        data = time.date()
+        dias = self.historico.setdefault((band, continent, time.hour), {})
+        dias[data] = dias.get(data, 0) + 1
+        self.dias_par.setdefault((band, continent), set()).add(data)
+
+    def _spot_repetido(self, spot_id) -> bool:
+        if spot_id is None:
+            return False
+        if spot_id in self.ids_vistos:
+            return True
+        if len(self.ids_recentes) == self.ids_recentes.maxlen:
+            self.ids_vistos.discard(self.ids_recentes[0])
+        self.ids_recentes.append(spot_id)
+        self.ids_vistos.add(spot_id)
+        return False
+
+    def _atualizar(self, time: datetime.datetime, band: str, continent: str,
+                   spot_id=None) -> Optional[Tuple[str, str]]:
+        if self._spot_repetido(spot_id):
+            return None
+        # Todo spot conta o dia como observado, mesmo fora das bandas
+        # monitoradas, para não inflar a baseline em dias de banda fechada
+        if not self._registrar_dia(time.date()):
+            return None
+        if self.ultimo_spot is None or time > self.ultimo_spot:
+            self.ultimo_spot = time
+        if self.bandas is not None and band not in self.bandas:
+            return None
+        if not isinstance(continent, str) or continent in ('', 'Desconhecido'):
+            return None
+
+        chave = (band, continent)
+        segundos = (time - EPOCA).total_seconds()
+        contadores = self.contadores.get(chave)
+        if contadores is None:
+            contadores = {
+                minutos: ContadorJanela(minutos * 60, self.bucket_segundos)
+                for minutos in self.janelas_minutos
+            }
+            self.contadores[chave] = contadores
+        for contador in contadores.values():
+            contador.adicionar(segundos)
+        self._registrar_historico(band, continent, time)
+        return chave
+
+    def _avaliar(self, chave: Tuple[str, str], time: datetime.datetime) -> Optional[Alerta]:
+        band, continent = chave
+        data = time.date()
+        if self.dias_historico(data) < self.min_dias_historico:
+            return None
+        ultimo = self.ultimo_alerta.get(chave)
+        if ultimo is not None and time - ultimo < self.cooldown:
+            return None
+
+        segundos = (time - EPOCA).total_seconds()
+        if chave in self.abertos:
+            # Uma abertura só é alertada de novo depois que a banda fecha
+            maior_janela = self.contadores[chave][max(self.janelas_minutos)]
+            if maior_janela.contar(segundos) >= self.min_spots:
+                return None
+            self.abertos.discard(chave)
+        for minutos, contador in self.contadores[chave].items():
+            num_spots = contador.contar(segundos)
+            if num_spots < self.min_spots:
+                continue
+            base = self.baseline(band, continent, time.hour, data, minutos)
+            if base == 0.0:
+                if not self.continente_novo(band, continent, data):
+                    continue
+            elif not self.acima_da_baseline(num_spots, base):
+                continue
+            return Alerta(time, band, continent, minutos, num_spots, base)
+        return None
+
+    def processar_spot(self, time: datetime.datetime, band: str,
+                       continent: str, spot_id=None) -> List[Alerta]:
+        """
+        Processa um spot e retorna os alertas disparados por ele.
+
+        Args:
+            time: Horário UTC do spot
+            band: Banda já mapeada (ex.: "10m")
+            continent: Continente do transmissor
+            spot_id: Identificador do spot, usado para ignorar repetições
+
+        Returns:
+            List[Alerta]: Alertas novos (vazio na maioria dos spots)
+        """
+        with self.lock:
+            chave = self._atualizar(time, band, continent, spot_id)
+            if chave is None:
+                return []
+            alerta = self._avaliar(chave, time)
+            if alerta is None:
+                return []
+            self.ultimo_alerta[chave] = time
+            self.abertos.add(chave)
+            self.alertas.append(alerta)
+        self._notificar(alerta)
+        return [alerta]
+
+    def processar_spots(self, spots: Iterable[tuple]) -> List[Alerta]:
+        """Processa uma sequência de (time, band, continent[, spot_id]) em ordem."""
+        novos = []
+        for spot in spots:
+            novos.extend(self.processar_spot(*spot))
+        return novos
+
+    def semear(self, spots: Iterable[tuple]) -> None:
+        """Alimenta contadores e histórico sem avaliar nem notificar alertas."""
+        with self.lock:
+            for spot in spots:
+                self._atualizar(*spot)
+
+    def alimentar(self, spots: Iterable[tuple]) -> List[Alerta]:
+        """Semeia na primeira carga e processa normalmente nas seguintes."""
+        with self.lock:
+            if self.ultimo_spot is None:
+                self.semear(spots)
+                return []
+            return self.processar_spots(spots)
+
+    def iniciar_poller(self, obter_spots: Callable[[Optional[datetime.datetime]], Iterable[tuple]],
+                       intervalo_segundos: float) -> threading.Thread:
+        """
+        Alimenta o monitor em segundo plano a cada `intervalo_segundos`.
+
+        Args:
+            obter_spots: Função que recebe o horário a partir do qual buscar
+                spots (None na primeira carga) e devolve tuplas
+                (time, band, continent, spot_id)
+            intervalo_segundos: Intervalo entre consultas
+
+        Returns:
+            threading.Thread: Thread do poller (parada com `parar_poller`)
+        """
+        def ciclo() -> None:
+            while True:
+                try:
+                    with self.lock:
+                        desde = self.ultimo_spot
+                    if desde is not None:
+                        # Reprocessa a última janela; repetições são ignoradas pelo id
+                        desde -= datetime.timedelta(minutes=max(self.janelas_minutos))
+                    self.alimentar(obter_spots(desde))
+                except Exception as e:
+                    logger.error(f"Erro ao alimentar monitor de aberturas: {str(e)}")
+                if self._parar.wait(intervalo_segundos):
+                    return
+
+        thread = threading.Thread(target=ciclo, name="monitor-aberturas", daemon=True)
+        thread.start()
+        return thread
+
+    def parar_poller(self) -> None:
+        """Interrompe o poller iniciado por `iniciar_poller`."""
+        self._parar.set()
+
+    def alertas_ativos(self, agora: Optional[datetime.datetime] = None) -> List[Alerta]:
+        """Alertas disparados dentro do período de cooldown."""
+        with self.lock:
+            agora = agora or self.ultimo_spot
+            if agora is None:
+                return []
+            return [a for a in self.alertas if agora - a.time < self.cooldown]
+
+    def _notificar(self, alerta: Alerta) -> None:
+        for notificador in self.notificadores:
+            try:
+                notificador(alerta)
+            except Exception as e:
+                logger.error(f"Erro ao notificar alerta: {str(e)}")
+
+
+def notificar_log(alerta: Alerta) -> None:
+    """Notificador que registra o alerta no log."""
+    logger.warning(alerta.mensagem())
+
+
+def criar_notificador_webhook(url: str, timeout: float = 5.0,
+                              tamanho_fila: int = 100) -> Callable[[Alerta], None]:
+    """
+    Cria um notificador que envia o alerta em JSON para um endpoint HTTP.
+
+    O envio é feito por uma thread em segundo plano, para que um endpoint
+    lento não bloqueie o dashboard. Alertas além de `tamanho_fila`
+    pendentes são descartados.
+
+    Args:
+        url: Endereço do webhook (ex.: endpoint local)
+        timeout: Tempo máximo da requisição em segundos
+        tamanho_fila: Máximo de alertas aguardando envio
+
+    Returns:
+        Callable[[Alerta], None]: Notificador para `adicionar_notificador`
+    """
+    fila: queue.Queue = queue.Queue(maxsize=tamanho_fila)
+
+    def enviar() -> None:
+        while True:
+            alerta = fila.get()
+            try:
+                requests.post(url, json=alerta.to_dict(), timeout=timeout)
+            except Exception as e:
+                logger.error(f"Erro ao enviar alerta para {url}: {str(e)}")
+            finally:
+                fila.task_done()
+
+    threading.Thread(target=enviar, name="webhook-alertas", daemon=True).start()
+
+    def notificar(alerta: Alerta) -> None:
+        try:
+            fila.put_nowait(alerta)
+        except queue.Full:
+            logger.error(f"Fila do webhook cheia, alerta descartado: {alerta.mensagem()}")
+    notificar.fila = fila
+    return notificar
@@ -25,3 +25,29 @@ POWER_MAPPING = {
 MODE_MAPPING = {
     1: "WSPR2/FST4W-120", 2: "FST4W-900", 4: "FST4W-300", 8: "FST4W-1800"
 }
+
+# Configuração do monitor de aberturas de banda em tempo real
+ALERTA_BANDAS = ["10m", "6m"]          # Bandas monitoradas (None para todas)
+ALERTA_JANELAS_MINUTOS = (15, 60)      # Janelas deslizantes avaliadas
+ALERTA_BUCKET_SEGUNDOS = 60            # Resolução de cada bucket do ring buffer
+ALERTA_MIN_SPOTS = 3                   # Spots mínimos na janela para alertar
+ALERTA_FATOR_BASELINE = 3.0            # Quantas vezes acima da baseline histórica
+ALERTA_BASELINE_MINIMA = 2.0           # Piso da baseline (spots por janela) no teste
+ALERTA_P_VALOR = 0.001                 # Probabilidade de Poisson máxima para alertar
+ALERTA_DIAS_BASELINE = 14              # Dias de histórico usados na baseline
+ALERTA_MIN_DIAS_HISTORICO = 3          # Dias observados antes de permitir alertas
+ALERTA_COOLDOWN_MINUTOS = 60           # Intervalo mínimo entre alertas do mesmo par
+ALERTA_MAX_IDS = 20000                 # Ids de spots recentes guardados para deduplicação
+ALERTA_INTERVALO_SEGUNDOS = 60         # Intervalo de leitura de novos spots
+ALERTA_WEBHOOK_URL = None              # Ex.: "http://localhost:8000/alertas"
+
+# Configuração da exportação de dados
+EXPORT_CHUNK_SIZE = 5000               # Linhas por bloco na escrita em streaming
+EXPORT_COLUNAS = [
+    'time', 'rx_sign', 'tx_sign', 'band', 'snr', 'distance', 'mode',
+    'power_w', 'azimuth_rx_to_tx', 'country', 'continent'
+]
+EXPORT_HOST = "127.0.0.1"              # Interface de escuta do endpoint de download
+EXPORT_PORTA = 8502                    # Porta do endpoint de download
+EXPORT_URL = f"http://localhost:{EXPORT_PORTA}"  # URL pública (sobrescrita pela env EXPORT_URL)
+INDICATIVOS_DB_PATH = 'indicativos.db'
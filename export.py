@@ -0,0 +1,458 @@
+"""Exportação em streaming de spots WSPR e tabelas agregadas."""
+
+import argparse
+import datetime
+import io
+import itertools
+import os
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, List, Optional, Sequence
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    EXPORT_CHUNK_SIZE, EXPORT_COLUNAS, EXPORT_HOST, EXPORT_PORTA, EXPORT_URL,
+    INDICATIVOS_DB_PATH
+)
+from data_processing import load_and_process_data
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'adif': ('text/plain; charset=utf-8', 'adi'),
+}
+TABELAS = ('spots', 'hora_banda', 'hora_continente')
+ADIF_COLUNAS = [
+    'tx_sign', 'time', 'band', 'frequency', 'snr', 'tx_loc', 'rx_sign',
+    'rx_loc', 'power_w', 'distance', 'country'
+]
+
+
+def mascara_filtros(df: pd.DataFrame,
+                    bandas: Optional[Sequence[str]] = None,
+                    data_inicial: Optional[datetime.date] = None,
+                    data_final: Optional[datetime.date] = None,
+                    hora_inicial: int = 0,
+                    hora_final: int = 23) -> pd.Series:
+    """
+    Monta a máscara booleana dos filtros da barra lateral do dashboard.
+
+    Args:
+        df: DataFrame de spots processados
+        bandas: Bandas selecionadas (None ou vazio para todas)
+        data_inicial: Data inicial inclusiva
+        data_final: Data final inclusiva
+        hora_inicial: Hora UTC inicial inclusiva
+        hora_final: Hora UTC final inclusiva
+
+    Returns:
+        pd.Series: True para os spots que passam nos filtros
+    """
+    mascara = df['continent'] != 'Desconhecido'
+    if bandas:
+        mascara &= df['band'].isin(bandas)
+    if data_inicial and data_final:
+        dias = df['time'].dt.normalize()
+        mascara &= (dias >= pd.Timestamp(data_inicial)) & (dias <= pd.Timestamp(data_final))
+    mascara &= (df['hour'] >= hora_inicial) & (df['hour'] <= hora_final)
+    return mascara
+
+
+def filtrar_spots(df: pd.DataFrame, *args, **kwargs) -> pd.DataFrame:
+    """Aplica os filtros de `mascara_filtros` e devolve os spots filtrados."""
+    return df[mascara_filtros(df, *args, **kwargs)]
+
+
+def agregar(df: pd.DataFrame, tabela: str,
+            mascara: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Gera as tabelas agregadas por hora cheia e banda ou continente."""
+    coluna = {'hora_banda': 'band', 'hora_continente': 'continent'}[tabela]
+    colunas = ['hora_cheia', coluna, 'id', 'snr']
+    # Só as colunas da agregação são copiadas
+    dados = df[colunas] if mascara is None else df.loc[mascara, colunas]
+    return dados.groupby(['hora_cheia', coluna]).agg(
+        num_spots=('id', 'count'),
+        avg_snr=('snr', 'mean')
+    ).reset_index()
+
+
+def _blocos(df: pd.DataFrame, chunk_size: int,
+            mascara: Optional[pd.Series] = None,
+            colunas: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+    """Materializa um bloco por vez, já filtrado e com as colunas pedidas."""
+    posicoes = slice(None) if colunas is None else [df.columns.get_loc(c) for c in colunas]
+    if mascara is None:
+        for inicio in range(0, len(df), chunk_size):
+            yield df.iloc[inicio:inicio + chunk_size, posicoes]
+        return
+    linhas = np.flatnonzero(mascara.to_numpy())
+    for inicio in range(0, len(linhas), chunk_size):
+        yield df.iloc[linhas[inicio:inicio + chunk_size], posicoes]
+
+
+def gerar_csv(modelo: pd.DataFrame, blocos: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Gera o CSV bloco a bloco; `modelo` é um DataFrame vazio com as colunas."""
+    yield modelo.to_csv(index=False).encode('utf-8')
+    for bloco in blocos:
+        yield bloco.to_csv(header=False, index=False).encode('utf-8')
+
+
+class _SaidaDrenavel(io.RawIOBase):
+    """Arquivo somente-escrita cujo conteúdo é drenado a cada bloco."""
+
+    def __init__(self):
+        super().__init__()
+        self.partes: List[bytes] = []
+        self.posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        dados = bytes(dados)
+        self.partes.append(dados)
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self.posicao
+
+    def drenar(self) -> bytes:
+        dados = b''.join(self.partes)
+        self.partes = []
+        return dados
+
+
+def gerar_parquet(modelo: pd.DataFrame, blocos: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Gera o Parquet com um row group por bloco."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Exportação em Parquet requer o pacote 'pyarrow'")
+
+    def gerar() -> Iterator[bytes]:
+        # Sem linhas, colunas object seriam inferidas como null; usa-se o
+        # primeiro bloco e as colunas ainda nulas viram string
+        primeiro = next(blocos, None)
+        referencia = modelo if primeiro is None else primeiro
+        schema = pa.Table.from_pandas(referencia, preserve_index=False).schema
+        for i, campo in enumerate(schema):
+            if pa.types.is_null(campo.type):
+                schema = schema.set(i, campo.with_type(pa.string()))
+        saida = _SaidaDrenavel()
+        with pq.ParquetWriter(saida, schema) as writer:
+            if primeiro is None:
+                writer.write_table(schema.empty_table())
+                restantes = iter(())
+            else:
+                restantes = itertools.chain([primeiro], blocos)
+            for bloco in restantes:
+                writer.write_table(pa.Table.from_pandas(bloco, schema=schema, preserve_index=False))
+                yield saida.drenar()
+        yield saida.drenar()
+
+    # pyarrow é verificado na chamada, antes de iniciar a resposta
+    return gerar()
+
+
+def _campo_adif(nome: str, valor) -> str:
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return ''
+    valor = str(valor)
+    return f"<{nome}:{len(valor.encode('utf-8'))}>{valor} "
+
+
+def _registro_adif(spot) -> str:
+    time = spot.time
+    return ''.join([
+        _campo_adif('CALL', spot.tx_sign),
+        _campo_adif('QSO_DATE', time.strftime('%Y%m%d')),
+        _campo_adif('TIME_ON', time.strftime('%H%M%S')),
+        _campo_adif('BAND', str(spot.band).upper() if isinstance(spot.band, str) else None),
+        _campo_adif('FREQ', f"{spot.frequency / 1e6:.6f}"),
+        _campo_adif('MODE', 'WSPR'),
+        _campo_adif('RST_SENT', spot.snr),
+        _campo_adif('GRIDSQUARE', spot.tx_loc),
+        _campo_adif('STATION_CALLSIGN', spot.rx_sign),
+        _campo_adif('MY_GRIDSQUARE', spot.rx_loc),
+        _campo_adif('RX_PWR', spot.power_w),
+        _campo_adif('DISTANCE', spot.distance),
+        _campo_adif('COUNTRY', getattr(spot, 'country', None)),
+        '<EOR>\n',
+    ])
+
+
+def gerar_adif(modelo: pd.DataFrame, blocos: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    """Gera um log ADIF com um registro por spot recebido."""
+    yield ("Spots WSPR exportados\n"
+           + _campo_adif('ADIF_VER', '3.1.4')
+           + _campo_adif('PROGRAMID', 'wspr')
+           + _campo_adif('CREATED_TIMESTAMP', datetime.datetime.utcnow().strftime('%Y%m%d %H%M%S'))
+           + '<EOH>\n').encode('utf-8')
+    for bloco in blocos:
+        yield ''.join(_registro_adif(spot) for spot in bloco.itertuples(index=False)).encode('utf-8')
+
+
+GERADORES = {
+    'csv': gerar_csv,
+    'parquet': gerar_parquet,
+    'adif': gerar_adif,
+}
+
+
+def gerar_exportacao(df: pd.DataFrame, formato: str, tabela: str = 'spots',
+                     chunk_size: int = EXPORT_CHUNK_SIZE,
+                     mascara: Optional[pd.Series] = None) -> Iterator[bytes]:
+    """
+    Gera os bytes da exportação em blocos, sem montar o arquivo em memória.
+
+    Args:
+        df: Spots processados
+        formato: 'csv', 'parquet' ou 'adif'
+        tabela: 'spots' ou uma das tabelas agregadas
+        chunk_size: Linhas por bloco
+        mascara: Filtro dos spots (ver `mascara_filtros`); None para todos
+
+    Returns:
+        Iterator[bytes]: Blocos do arquivo exportado
+    """
+    if formato not in GERADORES:
+        raise ValueError(f"Formato de exportação inválido: {formato}")
+    if tabela not in TABELAS:
+        raise ValueError(f"Tabela de exportação inválida: {tabela}")
+    if formato == 'adif' and tabela != 'spots':
+        raise ValueError("O formato ADIF só se aplica à tabela de spots")
+    if tabela == 'spots':
+        base = ADIF_COLUNAS if formato == 'adif' else EXPORT_COLUNAS
+        colunas = [c for c in base if c in df.columns]
+        return GERADORES[formato](df.iloc[:0][colunas], _blocos(df, chunk_size, mascara, colunas))
+    agregado = agregar(df, tabela, mascara)
+    return GERADORES[formato](agregado.iloc[:0], _blocos(agregado, chunk_size))
+
+
+def exportar_para_arquivo(df: pd.DataFrame, caminho: str, formato: str,
+                          tabela: str = 'spots', chunk_size: int = EXPORT_CHUNK_SIZE,
+                          mascara: Optional[pd.Series] = None) -> None:
+    """Grava a exportação em disco bloco a bloco, sem deixar arquivo parcial."""
+    blocos = gerar_exportacao(df, formato, tabela, chunk_size, mascara)
+    temporario = f"{caminho}.parcial"
+    try:
+        with open(temporario, 'wb') as arquivo:
+            for bloco in blocos:
+                arquivo.write(bloco)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def nome_arquivo(formato: str, tabela: str = 'spots') -> str:
+    """Nome sugerido para o arquivo exportado."""
+    return f"wspr_{tabela}.{FORMATOS[formato][1]}"
+
+
+def url_exportacao(formato: str, tabela: str = 'spots',
+                   bandas: Optional[Sequence[str]] = None,
+                   data_inicial: Optional[datetime.date] = None,
+                   data_final: Optional[datetime.date] = None,
+                   hora_inicial: int = 0, hora_final: int = 23,
+                   base_url: str = EXPORT_URL) -> str:
+    """Monta a URL do endpoint de download com os filtros atuais."""
+    params = [('formato', formato), ('tabela', tabela)]
+    params += [('banda', banda) for banda in bandas or []]
+    if data_inicial and data_final:
+        params += [('inicio', data_inicial.isoformat()), ('fim', data_final.isoformat())]
+    params += [('hora_inicio', hora_inicial), ('hora_fim', hora_final)]
+    return f"{base_url}/export?{urlencode(params)}"
+
+
+def carregar_spots(file_path: str = 'spots.json',
+                   db_path: str = INDICATIVOS_DB_PATH) -> pd.DataFrame:
+    """
+    Carrega os spots com país e continente do banco de indicativos.
+
+    Assim como no dashboard, indicativos sem registro no banco ficam
+    com país e continente nulos.
+    """
+    df = load_and_process_data(file_path).drop(columns=['tx_country', 'tx_continent'])
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        query = "SELECT callsign AS tx_sign, country, continent FROM indicativos"
+        indicativos = pd.read_sql_query(query, conn)
+        conn.close()
+        return df.merge(indicativos, on='tx_sign', how='left')
+    df['country'] = None
+    df['continent'] = None
+    return df
+
+
+def criar_carregador(file_path: str = 'spots.json',
+                     db_path: str = INDICATIVOS_DB_PATH) -> Callable[[], pd.DataFrame]:
+    """
+    Cria uma função que devolve os spots, recarregando-os quando o arquivo
+    de spots ou o banco de indicativos mudam em disco.
+    """
+    lock = threading.Lock()
+    estado = {'versao': None, 'df': None}
+
+    def versao():
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else None
+                     for p in (file_path, db_path))
+
+    def obter_spots() -> pd.DataFrame:
+        with lock:
+            atual = versao()
+            if atual != estado['versao']:
+                estado['df'] = carregar_spots(file_path, db_path)
+                estado['versao'] = atual
+            return estado['df']
+
+    return obter_spots
+
+
+def _parse_data(valor: Optional[str]) -> Optional[datetime.date]:
+    return datetime.date.fromisoformat(valor) if valor else None
+
+
+def criar_handler(obter_spots: Callable[[], pd.DataFrame]):
+    """Cria o handler HTTP que serve exportações com transferência em chunks."""
+
+    class ExportHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/export':
+                self.send_error(404)
+                return
+            params = parse_qs(url.query)
+            formato = params.get('formato', ['csv'])[0]
+            tabela = params.get('tabela', ['spots'])[0]
+            try:
+                df = obter_spots()
+                mascara = mascara_filtros(
+                    df,
+                    bandas=params.get('banda'),
+                    data_inicial=_parse_data(params.get('inicio', [None])[0]),
+                    data_final=_parse_data(params.get('fim', [None])[0]),
+                    hora_inicial=int(params.get('hora_inicio', [0])[0]),
+                    hora_final=int(params.get('hora_fim', [23])[0]),
+                )
+                blocos = gerar_exportacao(df, formato, tabela, mascara=mascara)
+                # O primeiro bloco é gerado antes dos cabeçalhos para que erros
+                # de conversão ainda possam ser respondidos com status de erro
+                primeiro = next(blocos, b'')
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            except ImportError as e:
+                # Dependência ausente no servidor, não erro do cliente
+                self.send_error(501, str(e))
+                return
+            except Exception as e:
+                self.log_error(f"Erro ao preparar exportação: {str(e)}")
+                self.send_error(500, str(e))
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', FORMATOS[formato][0])
+            self.send_header('Content-Disposition',
+                             f'attachment; filename="{nome_arquivo(formato, tabela)}"')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for bloco in itertools.chain([primeiro], blocos):
+                    if bloco:
+                        self.wfile.write(f"{len(bloco):X}\r\n".encode('ascii') + bloco + b"\r\n")
+            except Exception as e:
+                # Sem o bloco final o cliente percebe a resposta incompleta
+                self.log_error(f"Erro durante a exportação: {str(e)}")
+                self.close_connection = True
+                return
+            self.wfile.write(b"0\r\n\r\n")
+
+    return ExportHandler
+
+
+def criar_servidor(host: str = EXPORT_HOST, porta: int = EXPORT_PORTA,
+                   file_path: str = 'spots.json',
+                   db_path: str = INDICATIVOS_DB_PATH) -> ThreadingHTTPServer:
+    """Cria o servidor HTTP do endpoint de exportação."""
+    return ThreadingHTTPServer((host, porta), criar_handler(criar_carregador(file_path, db_path)))
+
+
+def iniciar_servidor(host: str = EXPORT_HOST, porta: int = EXPORT_PORTA,
+                     file_path: str = 'spots.json',
+                     db_path: str = INDICATIVOS_DB_PATH) -> ThreadingHTTPServer:
+    """Inicia o endpoint de exportação em uma thread em segundo plano."""
+    servidor = criar_servidor(host, porta, file_path, db_path)
+    threading.Thread(target=servidor.serve_forever, name="endpoint-exportacao",
+                     daemon=True).start()
+    return servidor
+
+
+def url_publica(porta: int = EXPORT_PORTA) -> str:
+    """
+    URL base do endpoint como vista pelo navegador.
+
+    Usa a variável de ambiente EXPORT_URL quando definida; em um Codespace,
+    monta o endereço da porta encaminhada; caso contrário, `EXPORT_URL`.
+    """
+    url = os.getenv('EXPORT_URL')
+    if url:
+        return url.rstrip('/')
+    codespace = os.getenv('CODESPACE_NAME')
+    dominio = os.getenv('GITHUB_CODESPACES_PORT_FORWARDING_DOMAIN')
+    if codespace and dominio:
+        return f"https://{codespace}-{porta}.{dominio}"
+    return EXPORT_URL
+
+
+def servir(host: str = EXPORT_HOST, porta: int = EXPORT_PORTA,
+           file_path: str = 'spots.json') -> None:
+    """Inicia o endpoint de download em streaming."""
+    servidor = criar_servidor(host, porta, file_path)
+    print(f"Endpoint de exportação em http://{host}:{porta}/export")
+    servidor.serve_forever()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Exporta spots WSPR filtrados.")
+    parser.add_argument('--spots', default='spots.json', help="Arquivo JSON de spots")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    arquivo = subparsers.add_parser('arquivo', help="Exporta para um arquivo")
+    arquivo.add_argument('saida', help="Caminho do arquivo de saída")
+    arquivo.add_argument('--formato', choices=list(FORMATOS), default='csv')
+    arquivo.add_argument('--tabela', choices=TABELAS, default='spots')
+    arquivo.add_argument('--banda', action='append', help="Banda (pode repetir)")
+    arquivo.add_argument('--inicio', type=datetime.date.fromisoformat, help="Data inicial (AAAA-MM-DD)")
+    arquivo.add_argument('--fim', type=datetime.date.fromisoformat, help="Data final (AAAA-MM-DD)")
+    arquivo.add_argument('--hora-inicio', type=int, default=0)
+    arquivo.add_argument('--hora-fim', type=int, default=23)
+    arquivo.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    servidor = subparsers.add_parser('servir', help="Inicia o endpoint de download")
+    servidor.add_argument('--host', default=EXPORT_HOST, help="Interface de escuta")
+    servidor.add_argument('--porta', type=int, default=EXPORT_PORTA)
+
+    args = parser.parse_args(argv)
+    if args.comando == 'servir':
+        servir(args.host, args.porta, args.spots)
+        return
+
+    df = carregar_spots(args.spots)
+    mascara = mascara_filtros(df, args.banda, args.inicio, args.fim,
+                              args.hora_inicio, args.hora_fim)
+    exportar_para_arquivo(df, args.saida, args.formato, args.tabela, args.chunk_size, mascara)
+    print(f"Exportação de {int(mascara.sum())} spots gravada em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""Testes do monitor de aberturas de banda."""
+
+import datetime
+import math
+import threading
+import time as relogio
+
+import band_monitor
+from band_monitor import ContadorJanela, MonitorAberturas, criar_notificador_webhook
+
+T0 = datetime.datetime(2024, 12, 1, 14, 0)
+
+
+def minutos(n: float) -> float:
+    return (T0 - band_monitor.EPOCA).total_seconds() + n * 60
+
+
+def criar_monitor(**kwargs) -> MonitorAberturas:
+    parametros = dict(bandas=None, janelas_minutos=(15,), min_spots=3,
+                      fator_baseline=3.0, dias_baseline=3, min_dias_historico=2,
+                      cooldown_minutos=60)
+    parametros.update(kwargs)
+    return MonitorAberturas(**parametros)
+
+
+def test_contador_soma_dentro_da_janela():
+    contador = ContadorJanela(15 * 60, 60)
+    for n in range(5):
+        contador.adicionar(minutos(n))
+    assert contador.contar(minutos(5)) == 5
+
+
+def test_contador_descarta_buckets_que_saem_da_janela():
+    contador = ContadorJanela(15 * 60, 60)
+    contador.adicionar(minutos(0))
+    contador.adicionar(minutos(10))
+    assert contador.contar(minutos(14)) == 2
+    # O bucket do minuto 0 sai da janela no minuto 15
+    assert contador.contar(minutos(15)) == 1
+    assert contador.contar(minutos(25)) == 0
+
+
+def test_contador_reinicia_apos_salto_maior_que_a_janela():
+    contador = ContadorJanela(15 * 60, 60)
+    for n in range(3):
+        contador.adicionar(minutos(n))
+    contador.adicionar(minutos(120))
+    assert contador.contar(minutos(120)) == 1
+    assert contador.buckets.count(0) == contador.num_buckets - 1
+
+
+def test_contador_aceita_spot_atrasado_dentro_da_janela():
+    contador = ContadorJanela(15 * 60, 60)
+    contador.adicionar(minutos(10))
+    contador.adicionar(minutos(3))
+    assert contador.contar(minutos(10)) == 2
+    assert contador.contar(minutos(18)) == 1
+
+
+def test_contador_descarta_spot_atrasado_fora_da_janela():
+    contador = ContadorJanela(15 * 60, 60)
+    contador.adicionar(minutos(30))
+    contador.adicionar(minutos(10))
+    assert contador.contar(minutos(30)) == 1
+
+
+def test_baseline_media_da_mesma_hora_escalada_para_janela():
+    monitor = criar_monitor(dias_baseline=4)
+    # Dia 1: 6 spots às 14h; dia 2: nenhum às 14h, mas dia observado
+    monitor.semear((T0 + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(6))
+    monitor.semear([(T0 + datetime.timedelta(days=1, hours=2), '10m', 'Europe')])
+    data = (T0 + datetime.timedelta(days=2)).date()
+    assert monitor.dias_historico(data) == 2
+    assert monitor.baseline('10m', 'Europe', 14, data, 60) == 3.0
+    assert monitor.baseline('10m', 'Europe', 14, data, 15) == 0.75
+    assert monitor.baseline('10m', 'Europe', 20, data, 60) == 0.0
+
+
+def test_baseline_considera_horas_vizinhas():
+    monitor = criar_monitor(dias_baseline=4)
+    monitor.semear((T0 + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(6))
+    monitor.semear([(T0 + datetime.timedelta(days=1, hours=8), '10m', 'Asia')])
+    data = (T0 + datetime.timedelta(days=2)).date()
+    assert monitor.baseline('10m', 'Europe', 15, data, 60) == 3.0
+    assert monitor.baseline('10m', 'Europe', 16, data, 60) == 0.0
+
+
+def test_dia_observado_conta_spots_de_outras_bandas():
+    monitor = criar_monitor(bandas=['10m'], dias_baseline=4)
+    monitor.semear((T0 + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(6))
+    # Dia 2: banda de 10m fechada, só spots em 40m
+    monitor.semear([(T0 + datetime.timedelta(days=1), '40m', 'Europe')])
+    data = (T0 + datetime.timedelta(days=2)).date()
+    assert monitor.dias_historico(data) == 2
+    assert monitor.baseline('10m', 'Europe', 14, data, 60) == 3.0
+
+
+def test_baseline_ignora_o_proprio_dia():
+    monitor = criar_monitor()
+    monitor.semear((T0 + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(6))
+    assert monitor.baseline('10m', 'Europe', 14, T0.date(), 60) == 0.0
+
+
+def test_historico_descarta_dias_fora_da_janela():
+    monitor = criar_monitor(dias_baseline=3)
+    for dia in range(6):
+        monitor.semear([(T0 + datetime.timedelta(days=dia), '10m', 'Europe')])
+    ultimo = (T0 + datetime.timedelta(days=5)).date()
+    esperados = {ultimo - datetime.timedelta(days=n) for n in range(4)}
+    assert monitor.dias_observados == esperados
+    assert set(monitor.historico[('10m', 'Europe', 14)]) == esperados
+    assert monitor.dias_par[('10m', 'Europe')] == esperados
+
+
+def test_historico_aceita_dia_atrasado_fora_de_ordem():
+    monitor = criar_monitor(dias_baseline=5)
+    monitor.semear([(T0, '10m', 'Europe'),
+                    (T0 + datetime.timedelta(days=2), '10m', 'Europe'),
+                    (T0 + datetime.timedelta(days=1), '10m', 'Europe')])
+    assert set(monitor.historico[('10m', 'Europe', 14)]) == {
+        (T0 + datetime.timedelta(days=n)).date() for n in range(3)
+    }
+    # Muito antigo para o histórico atual: descartado
+    monitor.semear([(T0 - datetime.timedelta(days=10), '10m', 'Europe')])
+    assert len(monitor.dias_observados) == 3
+
+
+def test_sem_alerta_antes_do_minimo_de_dias():
+    monitor = criar_monitor(min_dias_historico=2)
+    monitor.semear([(T0, '10m', 'Asia')])
+    spots = [(T0 + datetime.timedelta(days=1, minutes=n), '10m', 'Europe') for n in range(5)]
+    assert monitor.processar_spots(spots) == []
+
+
+def test_alerta_para_continente_novo_na_banda():
+    monitor = criar_monitor()
+    monitor.semear([(T0 + datetime.timedelta(days=d), '10m', 'Asia') for d in range(2)])
+    inicio = T0 + datetime.timedelta(days=2)
+    spots = [(inicio + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(5)]
+    alertas = monitor.processar_spots(spots)
+    assert len(alertas) == 1
+    assert alertas[0].continent == 'Europe'
+    assert alertas[0].num_spots == 3
+    assert alertas[0].baseline == 0.0
+
+
+def test_sem_alerta_com_baseline_zero_se_continente_ja_visto():
+    monitor = criar_monitor()
+    # Europa aparece às 16h nos dias anteriores, nunca às 14h
+    monitor.semear([(T0 + datetime.timedelta(days=d, hours=2), '10m', 'Europe') for d in range(2)])
+    inicio = T0 + datetime.timedelta(days=2)
+    spots = [(inicio + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(5)]
+    assert monitor.processar_spots(spots) == []
+
+
+def test_alerta_quando_supera_fator_da_baseline():
+    monitor = criar_monitor(dias_baseline=2)
+    # Um spot por dia às 14h: baseline de 0.25 na janela de 15 min, com piso de 2
+    monitor.semear([(T0 + datetime.timedelta(days=d), '10m', 'Europe') for d in range(2)])
+    inicio = T0 + datetime.timedelta(days=2)
+    spots = [(inicio + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(10)]
+    alertas = monitor.processar_spots(spots)
+    assert [a.num_spots for a in alertas] == [9]
+    assert alertas[0].baseline == 0.25
+
+
+def test_variacao_normal_nao_alerta():
+    monitor = criar_monitor(janelas_minutos=(60,), dias_baseline=3)
+    # Cerca de 5 spots por hora às 14h nos dias anteriores
+    monitor.semear((T0 + datetime.timedelta(days=d, minutes=12 * n), '10m', 'Europe')
+                   for d in range(3) for n in range(5))
+    inicio = T0 + datetime.timedelta(days=3)
+    spots = [(inicio + datetime.timedelta(minutes=6 * n), '10m', 'Europe') for n in range(10)]
+    assert monitor.processar_spots(spots) == []
+
+
+def test_poucos_spots_acima_de_baseline_baixa_nao_alertam():
+    monitor = criar_monitor(dias_baseline=2)
+    monitor.semear([(T0 + datetime.timedelta(days=d), '10m', 'Europe') for d in range(2)])
+    inicio = T0 + datetime.timedelta(days=2)
+    spots = [(inicio + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(5)]
+    assert monitor.processar_spots(spots) == []
+
+
+def test_probabilidade_poisson():
+    assert band_monitor.probabilidade_poisson(0, 2.0) == 1.0
+    assert abs(band_monitor.probabilidade_poisson(1, 2.0) - (1 - math.exp(-2.0))) < 1e-12
+    assert band_monitor.probabilidade_poisson(9, 2.0) < 0.001 < band_monitor.probabilidade_poisson(8, 2.0)
+
+
+def test_cooldown_evita_alertas_repetidos():
+    monitor = criar_monitor()
+    monitor.semear([(T0 + datetime.timedelta(days=d), '10m', 'Asia') for d in range(2)])
+    inicio = T0 + datetime.timedelta(days=2)
+    spots = [(inicio + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(30)]
+    assert len(monitor.processar_spots(spots)) == 1
+
+
+def test_abertura_em_andamento_so_alerta_de_novo_apos_fechar():
+    monitor = criar_monitor(cooldown_minutos=15)
+    monitor.semear([(T0 + datetime.timedelta(days=d), '10m', 'Asia') for d in range(2)])
+    inicio = T0 + datetime.timedelta(days=2)
+    # Banda aberta por 2 horas seguidas: um único alerta
+    spots = [(inicio + datetime.timedelta(minutes=2 * n), '10m', 'Europe') for n in range(60)]
+    assert len(monitor.processar_spots(spots)) == 1
+    # Depois de fechar, uma nova abertura é alertada
+    reabertura = inicio + datetime.timedelta(hours=5)
+    spots = [(reabertura + datetime.timedelta(minutes=n), '10m', 'Europe') for n in range(5)]
+    assert len(monitor.processar_spots(spots)) == 1
+
+
+def test_spots_repetidos_sao_ignorados_pelo_id():
+    monitor = criar_monitor(max_ids=3)
+    monitor.semear([(T0, '10m', 'Europe', 'a'), (T0, '10m', 'Europe', 'b'),
+                    (T0, '10m', 'Europe', 'a')])
+    assert monitor.contadores[('10m', 'Europe')][15].contar(minutos(0)) == 2
+    # Mesmo horário do último spot, id novo: contado
+    monitor.semear([(T0, '10m', 'Europe', 'c'), (T0, '10m', 'Europe', 'b')])
+    assert monitor.contadores[('10m', 'Europe')][15].contar(minutos(0)) == 3
+    # Ids antigos saem do conjunto ao exceder max_ids
+    monitor.semear([(T0, '10m', 'Europe', 'd')])
+    assert monitor.ids_vistos == {'b', 'c', 'd'}
+
+
+def test_alimentar_semeia_na_primeira_carga():
+    monitor = criar_monitor()
+    notificados = []
+    monitor.adicionar_notificador(notificados.append)
+    spots = [(T0 + datetime.timedelta(days=d, minutes=n), '10m', 'Europe') for d in range(4) for n in range(10)]
+    assert monitor.alimentar(spots) == []
+    assert notificados == []
+    assert monitor.ultimo_spot == spots[-1][0]
+
+
+def test_poller_alimenta_em_segundo_plano():
+    monitor = criar_monitor()
+    chamadas = []
+    alimentado = threading.Event()
+
+    def obter_spots(desde):
+        chamadas.append(desde)
+        if len(chamadas) >= 2:
+            alimentado.set()
+        return [(T0, '10m', 'Europe', 'x')]
+
+    monitor.iniciar_poller(obter_spots, 0.01)
+    assert alimentado.wait(2)
+    monitor.parar_poller()
+    assert chamadas[0] is None
+    assert chamadas[1] == T0 - datetime.timedelta(minutes=15)
+    assert monitor.contadores[('10m', 'Europe')][15].contar(minutos(0)) == 1
+
+
+def test_semear_nao_dispara_alertas_nem_notifica():
+    monitor = criar_monitor()
+    notificados = []
+    monitor.adicionar_notificador(notificados.append)
+    monitor.semear((T0 + datetime.timedelta(days=d, minutes=n), '10m', 'Europe')
+                   for d in range(4) for n in range(10))
+    assert notificados == []
+    assert monitor.alertas_ativos() == []
+
+
+def test_webhook_nao_bloqueia_o_chamador(monkeypatch):
+    liberar = threading.Event()
+    recebidos = []
+
+    def post_lento(url, json, timeout):
+        liberar.wait(5)
+        recebidos.append(json)
+
+    monkeypatch.setattr(band_monitor.requests, 'post', post_lento)
+    notificar = criar_notificador_webhook('http://localhost:9/alertas')
+    alerta = band_monitor.Alerta(T0, '10m', 'Europe', 15, 3, 0.0)
+
+    inicio = relogio.monotonic()
+    notificar(alerta)
+    assert relogio.monotonic() - inicio < 1
+    liberar.set()
+    notificar.fila.join()
+    assert recebidos == [alerta.to_dict()]
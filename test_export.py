@@ -0,0 +1,280 @@
+"""Testes da exportação em streaming."""
+
+import http.client
+import io
+import json
+import os
+import sqlite3
+import threading
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import export
+from export import (
+    carregar_spots, criar_carregador, criar_handler, exportar_para_arquivo,
+    filtrar_spots, gerar_exportacao
+)
+
+COLUNAS_JSON = [
+    "id", "time", "band", "rx_sign", "rx_lat", "rx_lon", "rx_loc",
+    "tx_sign", "tx_lat", "tx_lon", "tx_loc", "distance", "azimuth",
+    "rx_azimuth", "frequency", "power", "snr", "drift", "version", "code"
+]
+
+
+def criar_spots(n: int = 7) -> pd.DataFrame:
+    """DataFrame de spots como o do dashboard (colunas de texto em object)."""
+    time = pd.to_datetime(['2024-12-10 14:00'] * n) + pd.to_timedelta(range(n), unit='h')
+    return pd.DataFrame({
+        'id': [str(i) for i in range(n)],
+        'time': time,
+        'hour': time.hour,
+        'hora_cheia': time.strftime('%H:00'),
+        'rx_sign': ['PU9FSO'] * n,
+        'tx_sign': [f"K{i}ABC" for i in range(n)],
+        'rx_loc': ['GG27ns'] * n,
+        'tx_loc': ['DN70mq'] * n,
+        'band': ['10m', '6m'] * (n // 2) + ['10m'] * (n % 2),
+        'frequency': [28126013] * n,
+        'snr': list(range(-20, -20 + n)),
+        'distance': [8700] * n,
+        'mode': ['WSPR2/FST4W-120'] * n,
+        'power_w': [1.0] * n,
+        'azimuth_rx_to_tx': [323.0] * n,
+        'country': ['United States'] * (n - 1) + [None],
+        'continent': ['North America'] * (n - 2) + ['Desconhecido', None],
+    })
+
+
+def juntar(blocos) -> bytes:
+    return b''.join(blocos)
+
+
+def test_filtrar_spots_aplica_filtros_do_dashboard():
+    df = criar_spots()
+    filtrado = filtrar_spots(df, ['10m'], pd.Timestamp('2024-12-10').date(),
+                             pd.Timestamp('2024-12-10').date(), 15, 23)
+    assert set(filtrado['band']) == {'10m'}
+    assert filtrado['hour'].between(15, 23).all()
+    assert 'Desconhecido' not in set(filtrado['continent'])
+    # Continente nulo é mantido, como no dashboard
+    assert filtrado['continent'].isna().any()
+
+
+def test_csv_em_blocos_igual_ao_to_csv():
+    df = criar_spots()
+    dados = juntar(gerar_exportacao(df, 'csv', chunk_size=2))
+    esperado = df[[c for c in export.EXPORT_COLUNAS]].to_csv(index=False).encode('utf-8')
+    assert dados == esperado
+
+
+@pytest.mark.parametrize('tabela', export.TABELAS)
+def test_parquet_com_colunas_de_texto(tabela):
+    df = criar_spots()
+    assert df['tx_sign'].dtype == object
+    dados = juntar(gerar_exportacao(df, 'parquet', tabela, chunk_size=3))
+    lido = pq.read_table(io.BytesIO(dados)).to_pandas()
+    esperado = df if tabela == 'spots' else export.agregar(df, tabela)
+    assert len(lido) == len(esperado)
+    if tabela == 'spots':
+        assert list(lido['tx_sign']) == list(df['tx_sign'])
+        assert lido['country'].isna().sum() == 1
+        assert pq.read_metadata(io.BytesIO(dados)).num_row_groups == 3
+
+
+def test_parquet_com_coluna_nula_no_primeiro_bloco():
+    df = criar_spots(4)
+    df['country'] = [None, None, 'Brazil', 'Chile']
+    dados = juntar(gerar_exportacao(df, 'parquet', chunk_size=2))
+    assert list(pq.read_table(io.BytesIO(dados)).column('country').to_pylist()) == \
+        [None, None, 'Brazil', 'Chile']
+
+
+def test_parquet_vazio():
+    df = criar_spots().iloc[:0]
+    dados = juntar(gerar_exportacao(df, 'parquet'))
+    tabela = pq.read_table(io.BytesIO(dados))
+    assert tabela.num_rows == 0
+    assert 'tx_sign' in tabela.column_names
+
+
+def test_adif_um_registro_por_spot():
+    df = criar_spots(3)
+    texto = juntar(gerar_exportacao(df, 'adif')).decode('utf-8')
+    assert texto.count('<EOR>') == 3
+    assert '<CALL:5>K0ABC' in texto
+    assert '<RST_SENT:3>-20' in texto
+    assert 'RST_RCVD' not in texto
+    assert '<FREQ:9>28.126013' in texto
+
+
+def test_blocos_materializam_apenas_linhas_e_colunas_filtradas():
+    df = criar_spots()
+    mascara = export.mascara_filtros(df, ['10m'])
+    blocos = list(export._blocos(df, 2, mascara, ['tx_sign', 'band']))
+    assert [len(b) for b in blocos] == [2, 2]
+    assert all(list(b.columns) == ['tx_sign', 'band'] for b in blocos)
+    assert list(pd.concat(blocos)['tx_sign']) == list(filtrar_spots(df, ['10m'])['tx_sign'])
+
+
+def test_exportacao_com_mascara_igual_a_filtrar_antes():
+    df = criar_spots()
+    mascara = export.mascara_filtros(df, ['6m'], hora_inicial=15)
+    for tabela in export.TABELAS:
+        com_mascara = juntar(gerar_exportacao(df, 'csv', tabela, 2, mascara))
+        filtrado = juntar(gerar_exportacao(filtrar_spots(df, ['6m'], hora_inicial=15), 'csv', tabela, 2))
+        assert com_mascara == filtrado
+
+
+def test_formato_invalido():
+    with pytest.raises(ValueError):
+        gerar_exportacao(criar_spots(), 'xlsx')
+    with pytest.raises(ValueError):
+        gerar_exportacao(criar_spots(), 'adif', 'hora_banda')
+
+
+def test_exportar_para_arquivo_nao_deixa_arquivo_parcial(tmp_path, monkeypatch):
+    def gerar_com_erro(modelo, blocos):
+        yield b'id\n'
+        raise RuntimeError("falha de conversão")
+
+    monkeypatch.setitem(export.GERADORES, 'csv', gerar_com_erro)
+    caminho = tmp_path / 'saida.csv'
+    with pytest.raises(RuntimeError):
+        exportar_para_arquivo(criar_spots(), str(caminho), 'csv')
+    assert os.listdir(tmp_path) == []
+
+
+def test_exportar_para_arquivo(tmp_path):
+    caminho = tmp_path / 'saida.csv'
+    exportar_para_arquivo(criar_spots(), str(caminho), 'csv', chunk_size=2)
+    assert len(pd.read_csv(caminho)) == 7
+    assert os.listdir(tmp_path) == ['saida.csv']
+
+
+def gravar_spots_json(caminho, tx_signs):
+    linhas = [
+        [str(i), "2024-12-11 19:00:00", 28, "PU9FSO", -22.2, -54.8, "GG27ns",
+         tx, 40.6, -104.9, "DN70mq", 8700, 134, 323, 28126013, 30, -28, 0, "v1.2.74", 1]
+        for i, tx in enumerate(tx_signs)
+    ]
+    caminho.write_text(json.dumps(linhas))
+
+
+def criar_banco(caminho, registros):
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE TABLE indicativos (callsign TEXT PRIMARY KEY, country TEXT, continent TEXT)")
+    conn.executemany("INSERT INTO indicativos VALUES (?, ?, ?)", registros)
+    conn.commit()
+    conn.close()
+
+
+def test_carregar_spots_usa_banco_sem_prefixos(tmp_path):
+    spots = tmp_path / 'spots.json'
+    banco = tmp_path / 'indicativos.db'
+    gravar_spots_json(spots, ['WW0WWV', 'PY2XYZ'])
+    criar_banco(banco, [('WW0WWV', 'United States', 'North America')])
+    df = carregar_spots(str(spots), str(banco))
+    por_indicativo = df.set_index('tx_sign')
+    assert por_indicativo.loc['WW0WWV', 'continent'] == 'North America'
+    # PY estaria no mapeamento por prefixo ("América do Sul"), mas fica nulo
+    assert pd.isna(por_indicativo.loc['PY2XYZ', 'continent'])
+    assert 'tx_continent' not in df.columns
+
+
+def test_carregador_recarrega_quando_arquivo_muda(tmp_path):
+    spots = tmp_path / 'spots.json'
+    banco = tmp_path / 'indicativos.db'
+    gravar_spots_json(spots, ['WW0WWV'])
+    criar_banco(banco, [])
+    obter_spots = criar_carregador(str(spots), str(banco))
+    assert len(obter_spots()) == 1
+    assert obter_spots() is obter_spots()
+
+    gravar_spots_json(spots, ['WW0WWV', 'AG0X'])
+    os.utime(spots, (os.path.getmtime(spots) + 10,) * 2)
+    assert len(obter_spots()) == 2
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    df = criar_spots()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), criar_handler(lambda: df))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def requisitar(httpd, caminho):
+    conn = http.client.HTTPConnection(*httpd.server_address)
+    conn.request('GET', caminho)
+    resposta = conn.getresponse()
+    return resposta, resposta.read()
+
+
+def test_endpoint_transmite_csv(servidor):
+    resposta, corpo = requisitar(servidor, '/export?formato=csv&banda=10m')
+    assert resposta.status == 200
+    assert resposta.getheader('Transfer-Encoding') == 'chunked'
+    df = pd.read_csv(io.BytesIO(corpo))
+    assert set(df['band']) == {'10m'}
+
+
+def test_endpoint_formato_invalido_retorna_400(servidor):
+    resposta, _ = requisitar(servidor, '/export?formato=xlsx')
+    assert resposta.status == 400
+
+
+def test_endpoint_sem_pyarrow_retorna_501(servidor, monkeypatch):
+    def gerar_sem_pyarrow(modelo, blocos):
+        raise ImportError("Exportação em Parquet requer o pacote 'pyarrow'")
+
+    monkeypatch.setitem(export.GERADORES, 'parquet', gerar_sem_pyarrow)
+    resposta, _ = requisitar(servidor, '/export?formato=parquet')
+    assert resposta.status == 501
+
+
+def test_servidor_escuta_apenas_localhost_por_padrao(tmp_path):
+    servidor = export.criar_servidor(porta=0, file_path=str(tmp_path / 'spots.json'))
+    try:
+        assert servidor.server_address[0] == '127.0.0.1'
+    finally:
+        servidor.server_close()
+
+
+def test_iniciar_servidor_em_segundo_plano(tmp_path):
+    spots = tmp_path / 'spots.json'
+    gravar_spots_json(spots, ['WW0WWV', 'AG0X'])
+    httpd = export.iniciar_servidor(porta=0, file_path=str(spots), db_path=str(tmp_path / 'x.db'))
+    try:
+        resposta, corpo = requisitar(httpd, '/export?formato=csv')
+        assert resposta.status == 200
+        assert len(pd.read_csv(io.BytesIO(corpo))) == 2
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_url_publica(monkeypatch):
+    monkeypatch.delenv('EXPORT_URL', raising=False)
+    monkeypatch.delenv('CODESPACE_NAME', raising=False)
+    assert export.url_publica() == export.EXPORT_URL
+    monkeypatch.setenv('CODESPACE_NAME', 'wspr-abc')
+    monkeypatch.setenv('GITHUB_CODESPACES_PORT_FORWARDING_DOMAIN', 'app.github.dev')
+    assert export.url_publica(8502) == 'https://wspr-abc-8502.app.github.dev'
+    monkeypatch.setenv('EXPORT_URL', 'http://wspr.local:9000/')
+    assert export.url_publica() == 'http://wspr.local:9000'
+
+
+def test_endpoint_erro_de_conversao_retorna_500(servidor, monkeypatch):
+    def gerar_com_erro(modelo, blocos):
+        raise RuntimeError("falha de conversão")
+        yield b''
+
+    monkeypatch.setitem(export.GERADORES, 'csv', gerar_com_erro)
+    resposta, _ = requisitar(servidor, '/export?formato=csv')
+    assert resposta.status == 500